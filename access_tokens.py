@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Tokens de acceso firmados y sin estado para otros servicios internos
+
+Los tokens usan el formato compacto de JWT (HS256) con un identificador de
+clave (`kid`) en la cabecera, así las claves pueden rotarse: se firma con la
+clave activa y se verifica con cualquiera de las claves publicadas. La
+verificación es local, sin consultas a la base de datos ni a la red; este
+módulo solo usa la biblioteca estándar para que otros servicios puedan
+copiarlo o importarlo.
+
+Configuración por variables de entorno:
+    ACCESS_TOKEN_KEYS="2025-08:<secreto base64>,2025-07:<secreto base64>"
+    ACCESS_TOKEN_ACTIVE_KID="2025-08"
+    ACCESS_TOKEN_TTL=300  # segundos
+
+Uso:
+    python access_tokens.py generar-clave
+    python access_tokens.py benchmark
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+
+DEFAULT_ACCESS_TOKEN_TTL = 300  # segundos
+ACCESS_TOKEN_ISSUER = 'sistema-autenticacion'
+CLOCK_SKEW = 30  # segundos de tolerancia entre relojes de servicios
+MIN_KEY_BYTES = 32  # igual que generate_key()
+
+
+class InvalidTokenError(Exception):
+    """El token está mal formado, vencido o firmado con una clave desconocida"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data: str) -> bytes:
+    """Decodificar base64 url-safe sin relleno de forma estricta
+
+    urlsafe_b64decode descarta en silencio los caracteres fuera del alfabeto;
+    aquí se rechazan, igual que cualquier forma que no sea la canónica.
+    """
+    decoded = base64.b64decode(data + '=' * (-len(data) % 4), altchars=b'-_', validate=True)
+    if _b64encode(decoded) != data:
+        raise ValueError('Base64 no canónico')
+    return decoded
+
+
+def _check_key(kid: str, key: bytes):
+    """Rechazar secretos HMAC vacíos o más cortos que MIN_KEY_BYTES"""
+    if not isinstance(key, bytes) or len(key) < MIN_KEY_BYTES:
+        raise ValueError(f"La clave {kid!r} debe tener al menos {MIN_KEY_BYTES} bytes")
+
+
+def parse_keyset(value: str) -> dict:
+    """Interpretar "kid:secreto_base64,kid2:secreto_base64" como diccionario"""
+    keys = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        kid, sep, secret = item.partition(':')
+        if not sep or not kid or not secret:
+            raise ValueError(f"Entrada de clave inválida: {item!r}")
+        try:
+            key = _b64decode(secret)
+        except ValueError:
+            raise ValueError(f"Secreto base64url inválido para la clave {kid!r}") from None
+        _check_key(kid, key)
+        keys[kid] = key
+    return keys
+
+
+def load_keyset_from_env() -> dict:
+    """Leer las claves publicadas desde ACCESS_TOKEN_KEYS"""
+    return parse_keyset(os.environ.get('ACCESS_TOKEN_KEYS', ''))
+
+
+class TokenSigner:
+    """Emisor de tokens con la clave activa"""
+
+    def __init__(self, keys: dict, active_kid: str, ttl: int = DEFAULT_ACCESS_TOKEN_TTL,
+                 issuer: str = ACCESS_TOKEN_ISSUER):
+        if active_kid not in keys:
+            raise ValueError(f"La clave activa {active_kid!r} no está en el keyset")
+        _check_key(active_kid, keys[active_kid])
+        self.kid = active_kid
+        self.ttl = ttl
+        self.issuer = issuer
+        self._mac = hmac.new(keys[active_kid], digestmod=hashlib.sha256)
+        header = {'alg': 'HS256', 'typ': 'JWT', 'kid': active_kid}
+        self._header = _b64encode(json.dumps(header, separators=(',', ':')).encode())
+
+    def issue(self, user_id, email: str, nombre: str, now: float = None) -> str:
+        """Emitir un token de vida corta para el usuario autenticado"""
+        now = int(now if now is not None else time.time())
+        claims = {
+            'iss': self.issuer,
+            'sub': str(user_id),
+            'email': email,
+            'name': nombre,
+            'iat': now,
+            'exp': now + self.ttl,
+        }
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+        signing_input = f'{self._header}.{payload}'
+        mac = self._mac.copy()
+        mac.update(signing_input.encode('ascii'))
+        return f'{signing_input}.{_b64encode(mac.digest())}'
+
+
+def load_signer_from_env() -> TokenSigner:
+    """Crear el emisor con ACCESS_TOKEN_KEYS, ACCESS_TOKEN_ACTIVE_KID y ACCESS_TOKEN_TTL
+
+    Las variables se leen en cada llamada, no al importar el módulo, así un
+    valor inválido solo afecta a quien emite tokens.
+    """
+    raw_ttl = os.environ.get('ACCESS_TOKEN_TTL', str(DEFAULT_ACCESS_TOKEN_TTL))
+    try:
+        ttl = int(raw_ttl)
+    except ValueError:
+        raise ValueError(f"ACCESS_TOKEN_TTL debe ser un entero de segundos: {raw_ttl!r}") from None
+    if ttl <= 0:
+        raise ValueError(f"ACCESS_TOKEN_TTL debe ser positivo: {ttl}")
+    return TokenSigner(load_keyset_from_env(), os.environ.get('ACCESS_TOKEN_ACTIVE_KID', ''), ttl)
+
+
+_ENV_LOADER = object()
+
+
+class TokenVerifier:
+    """Verificador local con el keyset cacheado en memoria
+
+    El keyset se recarga con `refresh()` (por ejemplo desde un timer o al
+    recibir un `kid` desconocido); entre recargas no hay E/S. Sin `keys` se
+    usa ACCESS_TOKEN_KEYS como loader; con `keys` explícitas solo se recarga
+    si se pasa un `loader`, así un `kid` inventado no puede reemplazarlas.
+    """
+
+    def __init__(self, keys: dict = None, loader=_ENV_LOADER,
+                 issuer: str = ACCESS_TOKEN_ISSUER, refresh_interval: float = 300):
+        if loader is _ENV_LOADER:
+            loader = load_keyset_from_env if keys is None else None
+        self.issuer = issuer
+        self._loader = loader
+        self._refresh_interval = refresh_interval
+        self._macs = {}
+        self._loaded_at = 0.0
+        if keys is not None:
+            self._set_keys(keys)
+        else:
+            self.refresh()
+
+    def _set_keys(self, keys: dict):
+        for kid, key in keys.items():
+            _check_key(kid, key)
+        self._macs = {kid: hmac.new(key, digestmod=hashlib.sha256) for kid, key in keys.items()}
+        self._loaded_at = time.monotonic()
+
+    def refresh(self):
+        """Volver a leer las claves desde el loader configurado"""
+        if self._loader is not None:
+            self._set_keys(self._loader())
+
+    def _mac_for(self, kid):
+        mac = self._macs.get(kid)
+        if mac is None and self._loader is not None and \
+                time.monotonic() - self._loaded_at > self._refresh_interval:
+            # Puede ser una clave recién rotada: recargar como máximo una vez por intervalo
+            try:
+                self.refresh()
+            except Exception as e:
+                # Conservar el keyset anterior y no reintentar hasta el próximo intervalo
+                self._loaded_at = time.monotonic()
+                logging.error(f"No se pudo recargar el keyset de tokens: {e}")
+            mac = self._macs.get(kid)
+        return mac
+
+    def verify(self, token: str, now: float = None) -> dict:
+        """Validar firma, emisor y vencimiento; devuelve los claims
+
+        Raises:
+            InvalidTokenError: Si el token no es válido por cualquier motivo
+        """
+        try:
+            header_b64, payload_b64, signature_b64 = token.split('.')
+            header = json.loads(_b64decode(header_b64))
+        except (ValueError, AttributeError, TypeError) as e:
+            raise InvalidTokenError('Token mal formado') from e
+
+        if not isinstance(header, dict) or header.get('alg') != 'HS256':
+            raise InvalidTokenError('Algoritmo no soportado')
+        kid = header.get('kid')
+        if not isinstance(kid, str):
+            raise InvalidTokenError('Clave de firma desconocida')
+        mac = self._mac_for(kid)
+        if mac is None:
+            raise InvalidTokenError('Clave de firma desconocida')
+
+        mac = mac.copy()
+        try:
+            mac.update(f'{header_b64}.{payload_b64}'.encode('ascii'))
+            signature = _b64decode(signature_b64)
+        except ValueError as e:
+            raise InvalidTokenError('Token mal formado') from e
+        if not hmac.compare_digest(mac.digest(), signature):
+            raise InvalidTokenError('Firma inválida')
+
+        try:
+            claims = json.loads(_b64decode(payload_b64))
+        except ValueError as e:
+            raise InvalidTokenError('Token mal formado') from e
+        if not isinstance(claims, dict):
+            raise InvalidTokenError('Token mal formado')
+        now = now if now is not None else time.time()
+        if claims.get('iss') != self.issuer:
+            raise InvalidTokenError('Emisor inválido')
+        if not isinstance(claims.get('sub'), str) or not claims['sub']:
+            raise InvalidTokenError('Token sin sujeto')
+        if not isinstance(claims.get('exp'), int) or claims['exp'] + CLOCK_SKEW < now:
+            raise InvalidTokenError('Token vencido')
+        if isinstance(claims.get('iat'), int) and claims['iat'] - CLOCK_SKEW > now:
+            raise InvalidTokenError('Token emitido en el futuro')
+        return claims
+
+
+def generate_key() -> str:
+    """Generar un secreto aleatorio de 256 bits en base64 url-safe"""
+    return _b64encode(secrets.token_bytes(32))
+
+
+def run_benchmark(iterations: int):
+    """Medir emisiones y verificaciones por segundo"""
+    keys = {'bench-1': secrets.token_bytes(32), 'bench-0': secrets.token_bytes(32)}
+    signer = TokenSigner(keys, 'bench-1')
+    verifier = TokenVerifier(keys, loader=None)
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        token = signer.issue(i, f'usuario{i}@test.com', f'Usuario {i}')
+    elapsed = time.perf_counter() - start
+    print(f"Emisiones: {iterations / elapsed:,.0f}/s")
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        verifier.verify(token)
+    elapsed = time.perf_counter() - start
+    print(f"Verificaciones: {iterations / elapsed:,.0f}/s "
+          f"({elapsed / iterations * 1e6:.1f} µs por token)")
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('generar-clave', help='Imprimir un secreto nuevo para ACCESS_TOKEN_KEYS')
+    bench = sub.add_parser('benchmark', help='Medir emisiones y verificaciones por segundo')
+    bench.add_argument('--iteraciones', type=int, default=100_000)
+    args = parser.parse_args()
+
+    if args.command == 'generar-clave':
+        print(generate_key())
+    elif args.command == 'benchmark':
+        run_benchmark(args.iteraciones)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Verificación offline de contraseñas filtradas (formato HIBP)
+
+El archivo de datos es binario y ordenado: una cabecera fija seguida de
+registros de ancho fijo con los prefijos de los hashes. Se abre con mmap y
+se busca con búsqueda binaria, así cada consulta toca unas pocas páginas y
+el archivo nunca se carga entero en memoria.
+
+Uso:
+    python breached_passwords.py convertir pwned-passwords-sha1.txt breached.bin
+    python breached_passwords.py verificar breached.bin
+    python breached_passwords.py benchmark --registros 150000000
+"""
+import argparse
+import hashlib
+import logging
+import mmap
+import os
+import random
+import resource
+import struct
+import sys
+import tempfile
+import time
+
+from shared_file_cache import SharedFileCache
+
+BREACHED_PASSWORDS_PATH = os.environ.get('BREACHED_PASSWORDS_PATH', 'breached_passwords.bin')
+
+MAGIC = b'HIBPBIN1'
+HEADER = struct.Struct('>8sBB6x')  # magic, algoritmo, bytes por registro
+ALGORITHMS = {1: ('sha1', 20), 2: ('ntlm', 16)}
+ALGORITHM_IDS = {name: algo_id for algo_id, (name, _) in ALGORITHMS.items()}
+
+
+def _md4(data: bytes) -> bytes:
+    """MD4 (RFC 1320) en Python puro, para intérpretes cuyo OpenSSL no lo expone"""
+    mask = 0xFFFFFFFF
+
+    def rotl(x, n):
+        return ((x << n) | (x >> (32 - n))) & mask
+
+    message = data + b'\x80' + b'\x00' * ((55 - len(data)) % 64)
+    message += struct.pack('<Q', len(data) * 8)
+    state = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476]
+    for offset in range(0, len(message), 64):
+        x = struct.unpack('<16I', message[offset:offset + 64])
+        a, b, c, d = state
+        for i in range(16):
+            k, s = i, (3, 7, 11, 19)[i % 4]
+            a, b, c, d = d, rotl((a + ((b & c) | (~b & d)) + x[k]) & mask, s), b, c
+        for i in range(16):
+            k, s = (i % 4) * 4 + i // 4, (3, 5, 9, 13)[i % 4]
+            a, b, c, d = d, rotl((a + ((b & c) | (b & d) | (c & d)) + x[k] + 0x5A827999) & mask, s), b, c
+        for i in range(16):
+            k, s = (0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15)[i], (3, 9, 11, 15)[i % 4]
+            a, b, c, d = d, rotl((a + (b ^ c ^ d) + x[k] + 0x6ED9EBA1) & mask, s), b, c
+        state = [(v + w) & mask for v, w in zip(state, (a, b, c, d))]
+    return struct.pack('<4I', *state)
+
+
+def hash_password(password: str, algorithm: str = 'sha1') -> bytes:
+    """Calcular el hash binario de una contraseña según el algoritmo del archivo"""
+    if algorithm == 'sha1':
+        return hashlib.sha1(password.encode('utf-8')).digest()
+    if algorithm == 'ntlm':
+        # NTLM es MD4 sobre UTF-16LE; OpenSSL 3 no siempre expone MD4
+        data = password.encode('utf-16-le')
+        try:
+            return hashlib.new('md4', data).digest()
+        except ValueError:
+            return _md4(data)
+    raise ValueError(f"Algoritmo no soportado: {algorithm}")
+
+
+class BreachedPasswordIndex:
+    """Índice de solo lectura sobre un archivo binario de hashes filtrados"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            header = self._file.read(HEADER.size)
+            if len(header) != HEADER.size:
+                raise ValueError(f"Archivo de contraseñas filtradas inválido: {path}")
+            magic, algo_id, width = HEADER.unpack(header)
+            if magic != MAGIC or algo_id not in ALGORITHMS:
+                raise ValueError(f"Archivo de contraseñas filtradas inválido: {path}")
+            self.algorithm, digest_size = ALGORITHMS[algo_id]
+            if not 1 <= width <= digest_size:
+                raise ValueError(f"Ancho de registro inválido en {path}: {width}")
+            self.width = width
+
+            size = os.fstat(self._file.fileno()).st_size
+            if (size - HEADER.size) % width:
+                raise ValueError(f"Archivo de contraseñas filtradas truncado: {path}")
+            self.count = (size - HEADER.size) // width
+            self._mmap = None
+            if self.count:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                if hasattr(self._mmap, 'madvise') and hasattr(mmap, 'MADV_RANDOM'):
+                    self._mmap.madvise(mmap.MADV_RANDOM)
+        except Exception:
+            self._file.close()
+            raise
+
+    def contains_hash(self, digest: bytes) -> bool:
+        """Buscar un hash (o su prefijo) mediante búsqueda binaria"""
+        key = digest[:self.width]
+        data, width = self._mmap, self.width
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = HEADER.size + mid * width
+            record = data[offset:offset + width]
+            if record < key:
+                lo = mid + 1
+            elif record > key:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def contains(self, password: str) -> bool:
+        """Indicar si la contraseña aparece en el corpus filtrado"""
+        return self.contains_hash(hash_password(password, self.algorithm))
+
+    def close(self):
+        """Liberar el mapeo y el descriptor de archivo"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_index_cache = SharedFileCache(BreachedPasswordIndex, lambda: BREACHED_PASSWORDS_PATH,
+                               'contraseñas filtradas')
+
+
+def load_breached_password_index(path: str = None):
+    """Abrir el índice una sola vez por proceso; devuelve None si no está disponible
+
+    Con `path` se reemplaza el índice que usa is_breached_password.
+    """
+    return _index_cache.get(path)
+
+
+def close_breached_password_index():
+    """Cerrar el índice en caché; la próxima consulta lo vuelve a abrir"""
+    _index_cache.clear()
+
+
+def is_breached_password(password: str) -> bool:
+    """Verificar una contraseña; sin archivo disponible no se rechaza ninguna"""
+    index = load_breached_password_index()
+    if index is None:
+        return False
+    try:
+        return index.contains(password)
+    except ValueError as e:
+        logging.error(f"No se pudo verificar la contraseña contra el corpus filtrado: {e}")
+        return False
+
+
+def convert_hibp_file(source: str, destination: str, algorithm: str = 'sha1',
+                      prefix_bytes: int = None, min_count: int = 1) -> int:
+    """Convertir el formato de texto HIBP (HASH:CONTADOR, ordenado) al formato binario
+
+    Returns:
+        Cantidad de registros escritos
+    """
+    digest_size = dict(ALGORITHMS.values())[algorithm]
+    width = prefix_bytes or digest_size
+    if not 1 <= width <= digest_size:
+        raise ValueError(f"prefix_bytes debe estar entre 1 y {digest_size}")
+
+    written = 0
+    previous = b''
+    tmp_path = destination + '.tmp'
+    try:
+        with open(source, 'r', encoding='ascii') as src, open(tmp_path, 'wb') as dst:
+            dst.write(HEADER.pack(MAGIC, ALGORITHM_IDS[algorithm], width))
+            buffer = []
+            for line_number, line in enumerate(src, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                hex_hash, _, count = line.partition(':')
+                if count and int(count) < min_count:
+                    continue
+                digest = bytes.fromhex(hex_hash)
+                if len(digest) != digest_size:
+                    raise ValueError(f"Línea {line_number}: hash de longitud inválida")
+                record = digest[:width]
+                if record < previous:
+                    raise ValueError(
+                        f"Línea {line_number}: la entrada no está ordenada por hash"
+                    )
+                if record == previous:
+                    # Prefijos truncados pueden colisionar; se guarda uno solo
+                    continue
+                previous = record
+                buffer.append(record)
+                if len(buffer) >= 65536:
+                    dst.write(b''.join(buffer))
+                    written += len(buffer)
+                    buffer.clear()
+            dst.write(b''.join(buffer))
+            written += len(buffer)
+        os.replace(tmp_path, destination)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return written
+
+
+def generate_synthetic_file(path: str, records: int, width: int = 20, seed: int = 0):
+    """Generar un archivo ordenado de hashes sintéticos para benchmarks
+
+    Cada bloque de registros aleatorios lleva un prefijo de 4 bytes creciente
+    y se ordena por separado, así el archivo completo queda ordenado sin
+    tener que ordenarlo entero en memoria.
+    """
+    rng = random.Random(seed)
+    chunk_size = 65536
+    total_chunks = max(1, -(-records // chunk_size))
+    body = width - 4
+    with open(path, 'wb') as dst:
+        dst.write(HEADER.pack(MAGIC, ALGORITHM_IDS['sha1'], width))
+        remaining = records
+        chunk_index = 0
+        while remaining:
+            count = min(remaining, chunk_size)
+            prefix = (chunk_index * (1 << 32) // total_chunks).to_bytes(4, 'big')
+            data = rng.randbytes(count * body)
+            dst.write(b''.join(sorted(
+                prefix + data[i:i + body] for i in range(0, count * body, body)
+            )))
+            remaining -= count
+            chunk_index += 1
+        dst.flush()
+        os.fsync(dst.fileno())
+
+
+def _drop_page_cache(path: str) -> bool:
+    """Pedir al kernel que descarte las páginas cacheadas del archivo"""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+def _timed_lookups(index: BreachedPasswordIndex, probes) -> tuple:
+    """Tiempo total y fallos de página mayores de una pasada de búsquedas"""
+    faults_before = resource.getrusage(resource.RUSAGE_SELF).ru_majflt
+    start = time.perf_counter()
+    for digest in probes:
+        index.contains_hash(digest)
+    elapsed = time.perf_counter() - start
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_majflt - faults_before
+    return elapsed, faults
+
+
+def run_benchmark(records: int, lookups: int, path: str = None):
+    """Medir búsquedas con caché fría y caliente sobre un archivo sintético"""
+    cleanup = path is None
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+    try:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            start = time.perf_counter()
+            generate_synthetic_file(path, records)
+            print(f"Archivo sintético generado en {time.perf_counter() - start:.1f}s")
+
+        cold = _drop_page_cache(path)
+        with BreachedPasswordIndex(path) as index:
+            print(f"Archivo: {index.count:,} registros, "
+                  f"{os.path.getsize(path) / 2**30:.2f} GiB, "
+                  f"~{index.count.bit_length()} registros leídos por búsqueda")
+            rng = random.Random(1)
+            probes = [rng.randbytes(20) for _ in range(lookups)]
+
+            label = 'caché fría' if cold else 'primera pasada (sin posix_fadvise)'
+            for name in (label, 'caché caliente'):
+                elapsed, faults = _timed_lookups(index, probes)
+                print(f"Búsquedas de hash, {name}: {lookups / elapsed:,.0f}/s "
+                      f"({elapsed / lookups * 1e6:.1f} µs por búsqueda, "
+                      f"{faults / lookups:.2f} fallos de página mayores por búsqueda)")
+
+            start = time.perf_counter()
+            for i in range(lookups):
+                index.contains(f'password{i}')
+            elapsed = time.perf_counter() - start
+            print(f"Contraseñas (SHA-1 + búsqueda): {lookups / elapsed:,.0f}/s")
+    finally:
+        if cleanup:
+            os.unlink(path)
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    convert = sub.add_parser('convertir', help='Convertir archivo HIBP a formato binario')
+    convert.add_argument('origen')
+    convert.add_argument('destino')
+    convert.add_argument('--algoritmo', choices=sorted(ALGORITHM_IDS), default='sha1')
+    convert.add_argument('--prefijo-bytes', type=int, default=None,
+                         help='Truncar cada hash a N bytes (archivo más chico, algunos falsos positivos)')
+    convert.add_argument('--min-apariciones', type=int, default=1)
+
+    check = sub.add_parser('verificar', help='Consultar contraseñas de forma interactiva')
+    check.add_argument('archivo')
+
+    bench = sub.add_parser('benchmark', help='Medir búsquedas sobre un archivo sintético')
+    bench.add_argument('--registros', type=int, default=150_000_000,
+                       help='Registros de 20 bytes (por defecto ~2.8 GiB)')
+    bench.add_argument('--busquedas', type=int, default=100_000)
+    bench.add_argument('--archivo', default=None,
+                       help='Reutilizar (o crear) el archivo sintético en esta ruta')
+
+    args = parser.parse_args()
+
+    if args.command == 'convertir':
+        start = time.perf_counter()
+        written = convert_hibp_file(args.origen, args.destino, args.algoritmo,
+                                    args.prefijo_bytes, args.min_apariciones)
+        print(f"✅ {written} registros escritos en {args.destino} "
+              f"({time.perf_counter() - start:.1f}s)")
+    elif args.command == 'verificar':
+        with BreachedPasswordIndex(args.archivo) as index:
+            for line in sys.stdin:
+                password = line.rstrip('\n')
+                estado = 'FILTRADA' if index.contains(password) else 'no encontrada'
+                print(estado)
+    elif args.command == 'benchmark':
+        run_benchmark(args.registros, args.busquedas, args.archivo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Filtro compacto de contraseñas comunes (filtro de Bloom)
+
+El filtro se construye una vez desde una lista de palabras y se guarda en un
+archivo binario. Cada proceso lo abre con mmap, así todos los workers de
+gunicorn comparten las mismas páginas en lugar de tener cada uno su propio
+set de Python. Un filtro de Bloom nunca da falsos negativos; la tasa de
+falsos positivos se elige al construirlo.
+
+Uso:
+    python common_passwords.py construir rockyou-top100k.txt common_passwords.bin
+    python common_passwords.py verificar common_passwords.bin
+    python common_passwords.py benchmark rockyou-top100k.txt
+"""
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+
+from shared_file_cache import SharedFileCache
+
+COMMON_PASSWORDS_PATH = os.environ.get('COMMON_PASSWORDS_PATH', 'common_passwords.bin')
+COMMON_PASSWORD_ERROR = 'La contraseña es demasiado común. Elige una contraseña más segura.'
+
+MAGIC = b'BLOOMPW1'
+HEADER = struct.Struct('>8sB7xQQ')  # magic, cantidad de hashes, bits, elementos
+MAX_HASHES = 255
+
+
+def _positions(word: str, num_hashes: int, num_bits: int):
+    """Posiciones de bits por doble hashing sobre un único digest"""
+    digest = hashlib.blake2b(word.lower().encode('utf-8'), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'little') % num_bits
+    h2 = (int.from_bytes(digest[8:], 'little') | 1) % num_bits
+    for _ in range(num_hashes):
+        yield h1
+        h1 = (h1 + h2) % num_bits
+
+
+def build_filter(words, destination: str, false_positive_rate: float = 0.001) -> dict:
+    """Construir el archivo del filtro a partir de un iterable de contraseñas
+
+    Returns:
+        Diccionario con elementos, bits, hashes y tamaño en bytes
+
+    Raises:
+        ValueError: Si la tasa de falsos positivos no está entre 0 y 1
+    """
+    if not 0 < false_positive_rate < 1:
+        raise ValueError(
+            f"La tasa de falsos positivos debe estar entre 0 y 1 (sin incluirlos): "
+            f"{false_positive_rate}"
+        )
+    unique = {w.strip().lower() for w in words if w.strip()}
+    count = max(len(unique), 1)
+    num_bits = max(64, math.ceil(-count * math.log(false_positive_rate) / math.log(2) ** 2))
+    num_bits = (num_bits + 7) // 8 * 8
+    # La cabecera guarda la cantidad de hashes en un byte
+    num_hashes = min(MAX_HASHES, max(1, round(num_bits / count * math.log(2))))
+
+    bits = bytearray(num_bits // 8)
+    for word in unique:
+        for pos in _positions(word, num_hashes, num_bits):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    tmp_path = destination + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as dst:
+            dst.write(HEADER.pack(MAGIC, num_hashes, num_bits, len(unique)))
+            dst.write(bits)
+        os.replace(tmp_path, destination)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return {
+        'elementos': len(unique),
+        'bits': num_bits,
+        'hashes': num_hashes,
+        'bytes': HEADER.size + len(bits),
+    }
+
+
+class CommonPasswordFilter:
+    """Filtro de Bloom de solo lectura mapeado en memoria"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) != HEADER.size:
+                raise ValueError(f"Archivo de contraseñas comunes inválido: {path}")
+            magic, self.num_hashes, self.num_bits, self.count = HEADER.unpack(header)
+            if magic != MAGIC or not self.num_hashes or self.num_bits % 8:
+                raise ValueError(f"Archivo de contraseñas comunes inválido: {path}")
+            if os.fstat(f.fileno()).st_size != HEADER.size + self.num_bits // 8:
+                raise ValueError(f"Archivo de contraseñas comunes truncado: {path}")
+            # El mapeo sigue válido después de cerrar el archivo
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __contains__(self, password: str) -> bool:
+        data, offset = self._mmap, HEADER.size
+        for pos in _positions(password, self.num_hashes, self.num_bits):
+            if not data[offset + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def close(self):
+        """Liberar el mapeo"""
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_filter_cache = SharedFileCache(CommonPasswordFilter, lambda: COMMON_PASSWORDS_PATH,
+                                'contraseñas comunes')
+
+
+def load_common_password_filter(path: str = None):
+    """Abrir el filtro una sola vez por proceso; devuelve None si no está disponible
+
+    Llamarlo al importar la aplicación (antes del fork de gunicorn con
+    --preload) permite que los workers compartan el mapeo. Con `path` se
+    reemplaza el filtro que usa is_common_password.
+    """
+    return _filter_cache.get(path)
+
+
+def close_common_password_filter():
+    """Cerrar el filtro en caché; la próxima consulta lo vuelve a abrir"""
+    _filter_cache.clear()
+
+
+def is_common_password(password: str) -> bool:
+    """Verificar una contraseña; sin filtro disponible no se rechaza ninguna"""
+    common_filter = load_common_password_filter()
+    return common_filter is not None and password in common_filter
+
+
+def _read_memory_rollup() -> dict:
+    """Leer Rss, Pss y memoria privada (kB) del proceso actual desde /proc"""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[0].endswith(':'):
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'privada': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def _measure_forked_workers(setup, probes, workers: int) -> dict:
+    """Forkear workers y medir su memoria después de consultar
+
+    `setup()` devuelve la función de consulta. Se llama dentro de cada
+    worker, después del fork; si la estructura debe cargarse antes del fork
+    (como gunicorn con --preload), `setup` solo debe devolverla. Cada worker
+    espera a que los demás terminen antes de leer su memoria, así el Pss
+    reparte las páginas compartidas entre todos los procesos vivos.
+    Devuelve promedios por worker en kB.
+    """
+    children = []
+    for _ in range(workers):
+        ready_r, ready_w = os.pipe()
+        go_r, go_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            os.close(go_w)
+            try:
+                lookup = setup()
+                start = time.perf_counter()
+                for p in probes:
+                    lookup(p)
+                rate = len(probes) / (time.perf_counter() - start)
+                os.write(ready_w, b'1')
+                os.read(go_r, 1)
+                stats = _read_memory_rollup()
+                stats['consultas_s'] = rate
+                os.write(ready_w, json.dumps(stats).encode())
+            finally:
+                os._exit(0)
+        os.close(ready_w)
+        os.close(go_r)
+        children.append((pid, ready_r, go_w))
+
+    for _, ready_r, _ in children:
+        os.read(ready_r, 1)
+    results = []
+    for pid, ready_r, go_w in children:
+        os.write(go_w, b'1')
+        os.close(go_w)
+        results.append(json.loads(_read_all(ready_r)))
+        os.waitpid(pid, 0)
+    return {key: sum(r[key] for r in results) / len(results) for key in results[0]}
+
+
+def _read_all(fd: int) -> bytes:
+    """Leer un pipe hasta EOF y cerrarlo"""
+    chunks = []
+    while chunk := os.read(fd, 4096):
+        chunks.append(chunk)
+    os.close(fd)
+    return b''.join(chunks)
+
+
+def _run_isolated(scenario, probes, workers: int) -> dict:
+    """Ejecutar un escenario en un proceso maestro propio
+
+    Así la memoria que un escenario deja en el heap (por ejemplo un set ya
+    liberado) no aparece como compartida en los workers del siguiente.
+    """
+    result_r, result_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(result_r)
+        try:
+            os.write(result_w, json.dumps(
+                _measure_forked_workers(scenario(), probes, workers)
+            ).encode())
+        finally:
+            os._exit(0)
+    os.close(result_w)
+    data = _read_all(result_r)
+    os.waitpid(pid, 0)
+    if not data:
+        raise RuntimeError("El escenario del benchmark terminó sin resultados")
+    return json.loads(data)
+
+
+def run_benchmark(wordlist: str, lookups: int, workers: int = 4):
+    """Comparar memoria por worker (Rss/Pss/privada) y velocidad contra un set"""
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        raise RuntimeError("El benchmark necesita /proc/self/smaps_rollup (Linux)")
+    with open(wordlist, encoding='utf-8', errors='ignore') as f:
+        words = [line.strip() for line in f if line.strip()]
+    probes = [words[i % len(words)] if i % 2 else f'no-comun-{i}' for i in range(lookups)]
+
+    fd, path = tempfile.mkstemp(suffix='.bin')
+    os.close(fd)
+    try:
+        info = build_filter(words, path)
+
+        def baseline():
+            return lambda: (lambda p: None)
+
+        def set_per_worker():
+            def setup():
+                plain_set = {w.lower() for w in words}
+                return lambda p: p.lower() in plain_set
+            return setup
+
+        def set_preloaded():
+            plain_set = {w.lower() for w in words}
+            return lambda: (lambda p: p.lower() in plain_set)
+
+        def bloom_preloaded():
+            common_filter = CommonPasswordFilter(path)
+            return lambda: (lambda p: p in common_filter)
+
+        base = _run_isolated(baseline, probes, workers)
+        scenarios = (
+            ('set cargado en cada worker', _run_isolated(set_per_worker, probes, workers)),
+            ('set precargado antes del fork', _run_isolated(set_preloaded, probes, workers)),
+            ('filtro de Bloom (mmap)', _run_isolated(bloom_preloaded, probes, workers)),
+        )
+    finally:
+        os.unlink(path)
+
+    print(f"Palabras: {info['elementos']}; filtro de {info['bytes'] / 2**20:.2f} MiB "
+          f"con {info['hashes']} hashes; {workers} workers por escenario")
+    print("Memoria por worker sobre la línea base, de /proc/self/smaps_rollup (MiB):")
+    print("   escenario: Rss / Pss / privada, consultas/s")
+    for name, stats in scenarios:
+        rss, pss, private = (
+            (stats[key] - base[key]) / 1024 for key in ('rss', 'pss', 'privada')
+        )
+        print(f"   {name}: {rss:.2f} / {pss:.2f} / {private:.2f}, "
+              f"{stats['consultas_s']:,.0f} consultas/s")
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('construir', help='Construir el filtro desde una lista de palabras')
+    build.add_argument('lista')
+    build.add_argument('destino')
+    build.add_argument('--falsos-positivos', type=float, default=0.001)
+
+    check = sub.add_parser('verificar', help='Consultar contraseñas de forma interactiva')
+    check.add_argument('archivo')
+
+    bench = sub.add_parser('benchmark', help='Comparar el filtro contra un set de Python')
+    bench.add_argument('lista')
+    bench.add_argument('--consultas', type=int, default=200_000)
+    bench.add_argument('--workers', type=int, default=4)
+
+    args = parser.parse_args()
+
+    if args.command == 'construir':
+        try:
+            with open(args.lista, encoding='utf-8', errors='ignore') as f:
+                info = build_filter(f, args.destino, args.falsos_positivos)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ {info['elementos']} contraseñas, {info['bytes']} bytes, "
+              f"{info['hashes']} hashes -> {args.destino}")
+    elif args.command == 'verificar':
+        with CommonPasswordFilter(args.archivo) as common_filter:
+            for line in sys.stdin:
+                password = line.rstrip('\n')
+                print('COMÚN' if password in common_filter else 'no encontrada')
+    elif args.command == 'benchmark':
+        run_benchmark(args.lista, args.consultas, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Mantenimiento de la base de datos SQLite
+
+Comandos pensados para ejecutarse desde cron mientras gunicorn sigue
+atendiendo tráfico: cada operación usa un busy_timeout, trabaja en pasos
+cortos cuando es posible e informa su duración. El código de salida es
+distinto de cero si la operación falla.
+
+Uso:
+    python database_maintenance.py respaldo backups/database-$(date +%F).db
+    python database_maintenance.py checkpoint --modo TRUNCATE
+    python database_maintenance.py optimizar
+    python database_maintenance.py vacuum --paginas 500
+    python database_maintenance.py integridad --rapido
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+DATABASE_PATH = os.environ.get('DATABASE_PATH', 'database.db')
+BUSY_TIMEOUT_MS = 5000
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+ANALYSIS_LIMIT = 400  # filas por índice que examina un ANALYZE aproximado
+
+
+@contextmanager
+def maintenance_connection(db_path: str):
+    """Conexión con busy_timeout para convivir con los workers de la aplicación"""
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"No existe la base de datos: {db_path}")
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    try:
+        conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+        yield conn
+    finally:
+        conn.close()
+
+
+def backup_database(db_path: str, destination: str, pages: int = 256,
+                    pause: float = 0.01, progress=None, deadline: float = 600) -> dict:
+    """Respaldo en caliente con la API de backup
+
+    Requiere modo WAL: se mantiene abierta una transacción de lectura y se
+    copia de a `pages` páginas, así la copia sale de una instantánea fija y
+    los escritores siguen trabajando sin que el respaldo se reinicie. En modo
+    rollback journal (el que crea database_setup.py) una copia por pasos se
+    reiniciaría con cada escritura y una copia en un solo paso bloquearía a
+    los escritores, por eso se rechaza con RuntimeError.
+
+    Si el respaldo supera `deadline` segundos se aborta con RuntimeError. Se
+    escribe a un archivo temporal y se renombra al final para no dejar
+    respaldos parciales.
+    """
+    start = time.perf_counter()
+    tmp_path = destination + '.tmp'
+    steps = 0
+
+    def on_progress(status, remaining, total):
+        nonlocal steps
+        steps += 1
+        if progress:
+            progress(total - remaining, total)
+        if not remaining:
+            return
+        if deadline is not None and time.perf_counter() - start > deadline:
+            raise RuntimeError(
+                f"Respaldo abortado: se superó el límite de {deadline}s "
+                f"({total - remaining}/{total} páginas copiadas)"
+            )
+        if pause:
+            # sleep= de backup() solo actúa ante SQLITE_BUSY; esta pausa cede
+            # el lock también entre pasos normales
+            time.sleep(pause)
+
+    with maintenance_connection(db_path) as source:
+        journal_mode = source.execute('PRAGMA journal_mode').fetchone()[0]
+        if journal_mode != 'wal':
+            raise RuntimeError(
+                f"La base está en modo {journal_mode}, no en WAL: el respaldo bloquearía a "
+                f"los escritores. Actívalo una vez con: "
+                f"sqlite3 {db_path} 'PRAGMA journal_mode=WAL'"
+            )
+        source.execute('BEGIN')
+        source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        dest = sqlite3.connect(tmp_path)
+        try:
+            source.backup(dest, pages=pages, progress=on_progress, sleep=pause)
+            total_pages = dest.execute('PRAGMA page_count').fetchone()[0]
+        except Exception:
+            dest.close()
+            os.unlink(tmp_path)
+            raise
+        finally:
+            source.execute('COMMIT')
+        dest.close()
+    os.replace(tmp_path, destination)
+    return {
+        'destino': destination,
+        'paginas': total_pages,
+        'pasos': steps,
+        'bytes': os.path.getsize(destination),
+        'segundos': time.perf_counter() - start,
+    }
+
+
+def checkpoint_wal(db_path: str, mode: str = 'PASSIVE') -> dict:
+    """Ejecutar wal_checkpoint con el modo indicado
+
+    PASSIVE nunca bloquea; FULL y RESTART esperan a los lectores hasta el
+    busy_timeout; TRUNCATE además deja el archivo -wal en cero bytes.
+    """
+    mode = mode.upper()
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f"Modo de checkpoint inválido: {mode}")
+    start = time.perf_counter()
+    with maintenance_connection(db_path) as conn:
+        journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        busy, log_frames, checkpointed = conn.execute(
+            f'PRAGMA wal_checkpoint({mode})'
+        ).fetchone()
+    return {
+        'modo': mode,
+        'journal_mode': journal_mode,
+        'bloqueado': bool(busy),
+        'frames_wal': log_frames,
+        'frames_copiados': checkpointed,
+        'segundos': time.perf_counter() - start,
+    }
+
+
+def optimize_database(db_path: str, full_analyze: bool = False) -> dict:
+    """Actualizar estadísticas del planificador
+
+    Un PRAGMA optimize sin argumentos solo revisa las tablas que la propia
+    conexión ya consultó, así que en una conexión nueva no hace nada. Por
+    defecto se usa `PRAGMA optimize=0x10002` (revisar todas las tablas), que
+    existe desde SQLite 3.46; en versiones anteriores se ejecuta un ANALYZE
+    aproximado limitado por analysis_limit. Con `full_analyze` se ejecuta
+    ANALYZE completo.
+    """
+    start = time.perf_counter()
+    with maintenance_connection(db_path) as conn:
+        if full_analyze:
+            statement = 'ANALYZE'
+        else:
+            conn.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+            if sqlite3.sqlite_version_info >= (3, 46, 0):
+                statement = 'PRAGMA optimize=0x10002'
+            else:
+                statement = 'ANALYZE'
+        conn.execute(statement)
+    return {
+        'operacion': statement if full_analyze else f'{statement} (analysis_limit={ANALYSIS_LIMIT})',
+        'segundos': time.perf_counter() - start,
+    }
+
+
+def incremental_vacuum(db_path: str, pages: int = 500, enable: bool = False) -> dict:
+    """Liberar hasta `pages` páginas libres al sistema operativo
+
+    Requiere auto_vacuum=INCREMENTAL. Activarlo en una base existente
+    necesita un VACUUM completo, que bloquea la base mientras dura; por
+    eso solo se hace con `enable=True`.
+    """
+    start = time.perf_counter()
+    with maintenance_connection(db_path) as conn:
+        auto_vacuum = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+        if auto_vacuum != 2:
+            if not enable:
+                raise RuntimeError(
+                    "auto_vacuum no está en INCREMENTAL; usa --habilitar "
+                    "(ejecuta un VACUUM completo que bloquea la base)"
+                )
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+        free_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        # execute() avanza la sentencia un solo paso (una página);
+        # executescript() la ejecuta hasta el final
+        conn.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+        free_after = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    return {
+        'paginas_liberadas': free_before - free_after,
+        'paginas_libres_restantes': free_after,
+        'segundos': time.perf_counter() - start,
+    }
+
+
+def check_integrity(db_path: str, quick: bool = False) -> dict:
+    """Ejecutar integrity_check (o quick_check, que omite índices)"""
+    start = time.perf_counter()
+    pragma = 'quick_check' if quick else 'integrity_check'
+    with maintenance_connection(db_path) as conn:
+        problems = [row[0] for row in conn.execute(f'PRAGMA {pragma}')]
+    ok = problems == ['ok']
+    return {
+        'verificacion': pragma,
+        'ok': ok,
+        'problemas': [] if ok else problems,
+        'segundos': time.perf_counter() - start,
+    }
+
+
+def print_report(title: str, report: dict):
+    """Imprimir el resultado de una operación"""
+    print(f"✅ {title} ({report['segundos']:.2f}s)")
+    for key, value in report.items():
+        if key != 'segundos':
+            print(f"   {key}: {value}")
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', default=DATABASE_PATH,
+                        help='Ruta de la base de datos (por defecto DATABASE_PATH)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    backup = sub.add_parser('respaldo', help='Respaldo en caliente sin bloquear escritores (requiere WAL)')
+    backup.add_argument('destino')
+    backup.add_argument('--paginas', type=int, default=256, help='Páginas copiadas por paso')
+    backup.add_argument('--pausa', type=float, default=0.01, help='Segundos entre pasos')
+    backup.add_argument('--limite', type=float, default=600,
+                        help='Abortar si el respaldo tarda más de estos segundos')
+
+    checkpoint = sub.add_parser('checkpoint', help='Checkpoint del WAL')
+    checkpoint.add_argument('--modo', choices=CHECKPOINT_MODES, default='PASSIVE',
+                            type=str.upper)
+
+    optimize = sub.add_parser('optimizar', help='Actualizar estadísticas del planificador')
+    optimize.add_argument('--analyze', action='store_true', help='ANALYZE completo')
+
+    vacuum = sub.add_parser('vacuum', help='Vacuum incremental')
+    vacuum.add_argument('--paginas', type=int, default=500)
+    vacuum.add_argument('--habilitar', action='store_true',
+                        help='Activar auto_vacuum=INCREMENTAL (VACUUM completo, bloqueante)')
+
+    integrity = sub.add_parser('integridad', help='Verificación de integridad')
+    integrity.add_argument('--rapido', action='store_true', help='Usar quick_check')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'respaldo':
+            report = backup_database(
+                args.db, args.destino, args.paginas, args.pausa,
+                deadline=args.limite,
+                progress=lambda done, total: print(f"   {done}/{total} páginas", end='\r'),
+            )
+            print()
+            print_report('Respaldo', report)
+        elif args.command == 'checkpoint':
+            print_report('Checkpoint', checkpoint_wal(args.db, args.modo))
+        elif args.command == 'optimizar':
+            print_report('Optimización', optimize_database(args.db, args.analyze))
+        elif args.command == 'vacuum':
+            print_report('Vacuum incremental', incremental_vacuum(args.db, args.paginas,
+                                                                  args.habilitar))
+        elif args.command == 'integridad':
+            report = check_integrity(args.db, args.rapido)
+            if not report['ok']:
+                print(f"❌ Problemas de integridad en {args.db}:")
+                for problem in report['problemas']:
+                    print(f"   {problem}")
+                sys.exit(2)
+            print_report('Verificación de integridad', report)
+    except (sqlite3.Error, OSError, RuntimeError, ValueError) as e:
+        print(f"❌ Error en mantenimiento de base de datos: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Caché por proceso de archivos de solo lectura abiertos con mmap
+
+Lo usan breached_passwords.py y common_passwords.py: el archivo se abre una
+sola vez por proceso (antes del fork de gunicorn con --preload, los workers
+comparten el mapeo) y las consultas posteriores no hacen E/S.
+"""
+import logging
+import threading
+
+
+class SharedFileCache:
+    """Objeto de solo lectura abierto una vez por proceso, seguro entre hilos
+
+    `opener(path)` abre el archivo; `default_path()` da la ruta por defecto
+    (se evalúa en cada carga, así las variables de entorno y los tests
+    pueden cambiarla). Si el archivo falta o es inválido se registra el
+    error una vez y la caché queda en None.
+    """
+
+    def __init__(self, opener, default_path, description: str):
+        self._opener = opener
+        self._default_path = default_path
+        self._description = description
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded = False
+
+    def get(self, path: str = None):
+        """Devolver el objeto en caché, abriéndolo en la primera llamada
+
+        Con `path` se abre ese archivo y reemplaza al anterior para todas las
+        consultas siguientes. El anterior no se cierra: otro hilo puede estar
+        consultándolo, y su mmap se libera cuando nadie lo referencia.
+        """
+        if self._loaded and path is None:
+            return self._value
+        with self._lock:
+            # Otro hilo pudo haberlo abierto mientras se esperaba el lock
+            if self._loaded and path is None:
+                return self._value
+            path = path or self._default_path()
+            try:
+                value = self._opener(path)
+            except FileNotFoundError:
+                logging.warning(f"Archivo de {self._description} no encontrado: {path}")
+                value = None
+            except (OSError, ValueError) as e:
+                logging.error(f"Error al abrir archivo de {self._description}: {e}")
+                value = None
+            self._value, self._loaded = value, True
+            return value
+
+    def clear(self):
+        """Vaciar la caché y cerrar el objeto; solo para apagado y tests
+
+        A diferencia de get(path), cierra el mmap de inmediato, así que no
+        debe haber consultas en curso.
+        """
+        with self._lock:
+            value, self._value, self._loaded = self._value, None, False
+        if value is not None:
+            value.close()
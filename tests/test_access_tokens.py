@@ -0,0 +1,195 @@
+"""
+Tests para los tokens de acceso firmados
+"""
+import base64
+import hashlib
+import hmac
+import json
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from access_tokens import (
+    InvalidTokenError, TokenSigner, TokenVerifier, generate_key, load_keyset_from_env,
+    load_signer_from_env, parse_keyset,
+)
+
+# Cabecera {"alg":"HS256","kid":"zzz"} con un kid que no está en ningún keyset
+FORGED_KID_TOKEN = 'eyJhbGciOiJIUzI1NiIsImtpZCI6Inp6eiJ9.e30.AA'
+KEYS = {'k2': b'clave-actual-de-32-bytes-minimo!!', 'k1': b'clave-anterior-de-32-bytes-min!!'}
+
+
+@pytest.fixture
+def signer():
+    return TokenSigner(KEYS, 'k2', ttl=60)
+
+
+@pytest.fixture
+def verifier():
+    return TokenVerifier(KEYS, loader=None)
+
+
+class TestTokenIssuance:
+    """Tests para emisión y verificación de tokens"""
+
+    def test_roundtrip(self, signer, verifier):
+        """Test: Un token recién emitido se verifica y conserva los claims"""
+        token = signer.issue(7, 'juan@test.com', 'Juan Pérez')
+        claims = verifier.verify(token)
+
+        assert claims['sub'] == '7'
+        assert claims['email'] == 'juan@test.com'
+        assert claims['name'] == 'Juan Pérez'
+        assert claims['exp'] - claims['iat'] == 60
+
+    def test_expired_token(self, signer, verifier):
+        """Test: Un token vencido se rechaza"""
+        token = signer.issue(7, 'juan@test.com', 'Juan', now=1_000_000)
+        with pytest.raises(InvalidTokenError):
+            verifier.verify(token, now=1_000_000 + 60 + 31)
+
+    def test_tampered_payload(self, signer, verifier):
+        """Test: Modificar el payload invalida la firma"""
+        header, payload, signature = signer.issue(7, 'juan@test.com', 'Juan').split('.')
+        other = signer.issue(1, 'admin@test.com', 'Admin').split('.')[1]
+
+        with pytest.raises(InvalidTokenError):
+            verifier.verify(f'{header}.{other}.{signature}')
+
+    @pytest.mark.parametrize('token', [
+        '', 'abc', 'a.b.c', 'a.b', None,
+        # Cabeceras con kid que no es texto
+        'eyJhbGciOiJIUzI1NiIsImtpZCI6W119.e30.AA',
+        'eyJhbGciOiJIUzI1NiIsImtpZCI6e319.e30.AA',
+        'eyJhbGciOiJIUzI1NiIsImtpZCI6MX0.e30.AA',
+    ])
+    def test_malformed_token(self, verifier, token):
+        """Test: Tokens mal formados producen InvalidTokenError"""
+        with pytest.raises(InvalidTokenError):
+            verifier.verify(token)
+
+    def test_altered_encoding_rejected(self, signer, verifier):
+        """Test: Caracteres ajenos al alfabeto base64url invalidan el token"""
+        token = signer.issue(7, 'juan@test.com', 'Juan')
+        header, payload, signature = token.split('.')
+
+        for altered in (token + '!!', f'{header}.{payload}.{signature}=',
+                        f'{header}!.{payload}.{signature}', f'{header}.{payload}\n.{signature}',
+                        token.encode()):
+            with pytest.raises(InvalidTokenError):
+                verifier.verify(altered)
+
+    def test_token_without_subject(self, verifier):
+        """Test: Un token bien firmado pero sin sub de texto se rechaza"""
+        def sign(claims):
+            header = base64.urlsafe_b64encode(
+                json.dumps({'alg': 'HS256', 'kid': 'k2'}).encode()).rstrip(b'=')
+            payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b'=')
+            signing_input = header + b'.' + payload
+            signature = hmac.new(KEYS['k2'], signing_input, hashlib.sha256).digest()
+            return (signing_input + b'.' + base64.urlsafe_b64encode(signature).rstrip(b'=')).decode()
+
+        claims = {'iss': 'sistema-autenticacion', 'exp': 2**40}
+        for sub in (None, 7, ''):
+            token = sign(dict(claims, sub=sub) if sub is not None else claims)
+            with pytest.raises(InvalidTokenError):
+                verifier.verify(token)
+        assert verifier.verify(sign(dict(claims, sub='7')))['sub'] == '7'
+
+
+class TestKeyRotation:
+    """Tests para rotación de claves por kid"""
+
+    def test_previous_key_still_valid(self, verifier):
+        """Test: Tokens firmados con la clave anterior siguen siendo válidos"""
+        old_token = TokenSigner(KEYS, 'k1').issue(3, 'maria@test.com', 'María')
+        assert verifier.verify(old_token)['sub'] == '3'
+
+    def test_unknown_kid(self, signer):
+        """Test: Una clave retirada del keyset ya no valida"""
+        token = signer.issue(7, 'juan@test.com', 'Juan')
+        verifier = TokenVerifier({'k1': KEYS['k1']}, loader=None)
+        with pytest.raises(InvalidTokenError):
+            verifier.verify(token)
+
+    def test_unknown_kid_triggers_refresh(self, signer):
+        """Test: Un kid desconocido recarga el keyset una vez por intervalo"""
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return KEYS
+
+        verifier = TokenVerifier({'k1': KEYS['k1']}, loader=loader, refresh_interval=0)
+        assert verifier.verify(signer.issue(7, 'juan@test.com', 'Juan'))['sub'] == '7'
+        assert len(calls) == 1
+
+    def test_explicit_keys_ignore_env(self, signer, monkeypatch):
+        """Test: Con claves explícitas un kid inventado no vacía el keyset"""
+        monkeypatch.delenv('ACCESS_TOKEN_KEYS', raising=False)
+        verifier = TokenVerifier(KEYS, refresh_interval=0)
+
+        with pytest.raises(InvalidTokenError):
+            verifier.verify(FORGED_KID_TOKEN)
+        assert verifier.verify(signer.issue(7, 'juan@test.com', 'Juan'))['sub'] == '7'
+
+    def test_failed_refresh_keeps_keyset(self, signer, monkeypatch):
+        """Test: Si el loader falla se conserva el keyset y no se reintenta enseguida"""
+        monkeypatch.setenv('ACCESS_TOKEN_KEYS', 'k:=')
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return load_keyset_from_env()
+
+        verifier = TokenVerifier(KEYS, loader=loader, refresh_interval=60)
+        verifier._loaded_at -= 61
+        for _ in range(3):
+            with pytest.raises(InvalidTokenError):
+                verifier.verify(FORGED_KID_TOKEN)
+        assert len(calls) == 1
+        assert verifier.verify(signer.issue(7, 'juan@test.com', 'Juan'))['sub'] == '7'
+
+    def test_short_keys_rejected(self):
+        """Test: Secretos vacíos o cortos no se aceptan"""
+        with pytest.raises(ValueError):
+            parse_keyset('k:=')
+        with pytest.raises(ValueError):
+            parse_keyset('k:' + base64.urlsafe_b64encode(b'corta').decode())
+        with pytest.raises(ValueError):
+            TokenSigner({'k': b''}, 'k')
+        with pytest.raises(ValueError):
+            TokenVerifier({'k': b'x' * 31}, loader=None)
+
+    def test_parse_keyset(self):
+        """Test: El formato de ACCESS_TOKEN_KEYS se interpreta correctamente"""
+        key = generate_key()
+        keys = parse_keyset(f'a:{key}, b:{key}')
+        assert set(keys) == {'a', 'b'}
+        assert len(keys['a']) == 32
+
+        with pytest.raises(ValueError):
+            parse_keyset('sin-secreto')
+        with pytest.raises(ValueError):
+            parse_keyset(f'a:{key}!')
+
+    def test_signer_from_env(self, monkeypatch):
+        """Test: El emisor se configura desde variables de entorno"""
+        monkeypatch.setenv('ACCESS_TOKEN_KEYS', f'k9:{generate_key()}')
+        monkeypatch.setenv('ACCESS_TOKEN_ACTIVE_KID', 'k9')
+
+        token = load_signer_from_env().issue(1, 'a@test.com', 'A')
+        assert TokenVerifier().verify(token)['sub'] == '1'
+
+    def test_signer_ttl_read_at_call_time(self, monkeypatch):
+        """Test: ACCESS_TOKEN_TTL se lee al crear el emisor, no al importar"""
+        monkeypatch.setenv('ACCESS_TOKEN_KEYS', f'k9:{generate_key()}')
+        monkeypatch.setenv('ACCESS_TOKEN_ACTIVE_KID', 'k9')
+        monkeypatch.setenv('ACCESS_TOKEN_TTL', '60')
+        assert load_signer_from_env().ttl == 60
+
+        for invalid in ('5m', '0', '-10'):
+            monkeypatch.setenv('ACCESS_TOKEN_TTL', invalid)
+            with pytest.raises(ValueError):
+                load_signer_from_env()
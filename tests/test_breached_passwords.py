@@ -0,0 +1,128 @@
+"""
+Tests para la verificación offline de contraseñas filtradas
+"""
+import hashlib
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import breached_passwords
+from breached_passwords import BreachedPasswordIndex, convert_hibp_file
+
+PASSWORDS_FILTRADAS = ['123456', 'password', 'qwerty', 'iloveyou', 'password123']
+
+
+@pytest.fixture
+def hibp_file(tmp_path):
+    """Archivo de texto en formato HIBP ordenado por hash"""
+    lines = sorted(
+        f"{hashlib.sha1(p.encode()).hexdigest().upper()}:{i + 1}"
+        for i, p in enumerate(PASSWORDS_FILTRADAS)
+    )
+    path = tmp_path / 'pwned.txt'
+    path.write_text('\n'.join(lines) + '\n')
+    return path
+
+
+class TestConverter:
+    """Tests para el conversor de formato HIBP"""
+
+    def test_convert_and_lookup(self, hibp_file, tmp_path):
+        """Test: Las contraseñas convertidas se encuentran, las demás no"""
+        destino = tmp_path / 'breached.bin'
+        written = convert_hibp_file(str(hibp_file), str(destino))
+        assert written == len(PASSWORDS_FILTRADAS)
+
+        with BreachedPasswordIndex(str(destino)) as index:
+            for password in PASSWORDS_FILTRADAS:
+                assert index.contains(password)
+            assert not index.contains('una-contraseña-muy-larga-y-unica')
+
+    def test_convert_prefix_bytes(self, hibp_file, tmp_path):
+        """Test: Los prefijos truncados reducen el archivo y siguen encontrando hashes"""
+        destino = tmp_path / 'breached.bin'
+        convert_hibp_file(str(hibp_file), str(destino), prefix_bytes=8)
+        assert destino.stat().st_size == 16 + 8 * len(PASSWORDS_FILTRADAS)
+
+        with BreachedPasswordIndex(str(destino)) as index:
+            assert index.contains('qwerty')
+
+    def test_convert_min_count(self, hibp_file, tmp_path):
+        """Test: Se descartan hashes con pocas apariciones"""
+        destino = tmp_path / 'breached.bin'
+        written = convert_hibp_file(str(hibp_file), str(destino), min_count=3)
+        assert written == len(PASSWORDS_FILTRADAS) - 2
+
+    def test_convert_and_lookup_ntlm(self, tmp_path):
+        """Test: Un archivo NTLM se consulta aunque OpenSSL no exponga MD4"""
+        source = tmp_path / 'pwned-ntlm.txt'
+        source.write_text('8846F7EAEE8FB117AD06BDD830B7586C:1\n')  # NTLM de 'password'
+        destino = tmp_path / 'breached.bin'
+        convert_hibp_file(str(source), str(destino), algorithm='ntlm')
+
+        with BreachedPasswordIndex(str(destino)) as index:
+            assert index.algorithm == 'ntlm'
+            assert index.contains('password')
+            assert not index.contains('Password')
+
+    @pytest.mark.parametrize('data,expected', [
+        (b'', '31d6cfe0d16ae931b73c59d7e0c089c0'),
+        (b'abc', 'a448017aaf21d8525fc10ae87aa6729d'),
+        (b'1234567890' * 8, 'e33b4ddc9c38f2199c3e7b164fcc0536'),
+    ])
+    def test_md4_fallback(self, data, expected):
+        """Test: El MD4 en Python puro coincide con los vectores del RFC 1320"""
+        assert breached_passwords._md4(data).hex() == expected
+
+    def test_convert_rejects_unsorted(self, tmp_path):
+        """Test: Una entrada desordenada produce error y no deja archivos"""
+        source = tmp_path / 'pwned.txt'
+        source.write_text('F' * 40 + ':1\n' + '0' * 40 + ':1\n')
+        destino = tmp_path / 'breached.bin'
+
+        with pytest.raises(ValueError):
+            convert_hibp_file(str(source), str(destino))
+        assert not destino.exists()
+        assert not (tmp_path / 'breached.bin.tmp').exists()
+
+
+@pytest.fixture
+def index_cache():
+    """Vaciar el índice en caché antes y después del test, cerrando su mmap"""
+    breached_passwords.close_breached_password_index()
+    yield
+    breached_passwords.close_breached_password_index()
+
+
+@pytest.mark.usefixtures('index_cache')
+class TestIndexLoading:
+    """Tests para la carga del índice"""
+
+    def test_missing_file_is_graceful(self, tmp_path, monkeypatch):
+        """Test: Sin archivo no se rechaza ninguna contraseña"""
+        monkeypatch.setattr(breached_passwords, 'BREACHED_PASSWORDS_PATH',
+                            str(tmp_path / 'no-existe.bin'))
+
+        assert breached_passwords.load_breached_password_index() is None
+        assert breached_passwords.is_breached_password('123456') is False
+
+    def test_invalid_file_is_graceful(self, tmp_path, monkeypatch):
+        """Test: Un archivo corrupto se ignora con un error en el log"""
+        path = tmp_path / 'corrupto.bin'
+        path.write_bytes(b'no es un indice')
+        monkeypatch.setattr(breached_passwords, 'BREACHED_PASSWORDS_PATH', str(path))
+
+        assert breached_passwords.is_breached_password('123456') is False
+
+    def test_synthetic_file_lookup(self, tmp_path):
+        """Test: Búsqueda binaria sobre un archivo sintético grande"""
+        path = tmp_path / 'synthetic.bin'
+        breached_passwords.generate_synthetic_file(str(path), 10000)
+
+        with BreachedPasswordIndex(str(path)) as index:
+            assert index.count == 10000
+            offset = 16 + 1234 * 20
+            record = path.read_bytes()[offset:offset + 20]
+            assert index.contains_hash(record)
+            assert not index.contains_hash(b'\xff' * 20)
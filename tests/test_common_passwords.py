@@ -0,0 +1,109 @@
+"""
+Tests para el filtro de contraseñas comunes
+"""
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import common_passwords
+from common_passwords import CommonPasswordFilter, build_filter
+
+PASSWORDS_COMUNES = ['123456', 'password', 'qwerty', 'iloveyou', 'admin', 'contraseña']
+
+
+@pytest.fixture
+def filter_path(tmp_path):
+    """Filtro construido con una lista corta de contraseñas comunes"""
+    path = tmp_path / 'common.bin'
+    build_filter(PASSWORDS_COMUNES, str(path))
+    return str(path)
+
+
+class TestCommonPasswordFilter:
+    """Tests para construcción y consulta del filtro"""
+
+    def test_no_false_negatives(self, filter_path):
+        """Test: Todas las contraseñas de la lista son detectadas"""
+        with CommonPasswordFilter(filter_path) as common_filter:
+            for password in PASSWORDS_COMUNES:
+                assert password in common_filter
+
+    def test_case_insensitive(self, filter_path):
+        """Test: La consulta no distingue mayúsculas"""
+        with CommonPasswordFilter(filter_path) as common_filter:
+            assert 'PASSWORD' in common_filter
+            assert 'QwErTy' in common_filter
+
+    def test_false_positive_rate(self, tmp_path):
+        """Test: La tasa de falsos positivos respeta la configurada"""
+        path = tmp_path / 'common.bin'
+        build_filter((f'comun{i}' for i in range(5000)), str(path), 0.01)
+
+        with CommonPasswordFilter(str(path)) as common_filter:
+            false_positives = sum(f'segura-{i}' in common_filter for i in range(20000))
+        assert false_positives / 20000 < 0.03
+
+    @pytest.mark.parametrize('rate', [0, 1, 1.5, -0.1, float('nan')])
+    def test_invalid_false_positive_rate(self, tmp_path, rate):
+        """Test: Una tasa de falsos positivos fuera de (0, 1) se rechaza"""
+        path = tmp_path / 'common.bin'
+        with pytest.raises(ValueError):
+            build_filter(PASSWORDS_COMUNES, str(path), rate)
+        assert not path.exists()
+
+    def test_tiny_false_positive_rate(self, tmp_path):
+        """Test: Una tasa muy baja limita la cantidad de hashes a la cabecera"""
+        path = tmp_path / 'common.bin'
+        info = build_filter(PASSWORDS_COMUNES, str(path), 1e-90)
+        assert info['hashes'] == common_passwords.MAX_HASHES
+
+        with CommonPasswordFilter(str(path)) as common_filter:
+            assert 'qwerty' in common_filter
+
+    def test_build_failure_removes_tmp(self, tmp_path, monkeypatch):
+        """Test: Si falla la escritura no queda el archivo temporal"""
+        destino = tmp_path / 'common.bin'
+
+        def failing_replace(src, dst):
+            raise OSError('disco lleno')
+
+        monkeypatch.setattr(common_passwords.os, 'replace', failing_replace)
+        with pytest.raises(OSError):
+            build_filter(PASSWORDS_COMUNES, str(destino))
+        assert not destino.exists()
+        assert not (tmp_path / 'common.bin.tmp').exists()
+
+    def test_invalid_file(self, tmp_path):
+        """Test: Un archivo con formato incorrecto se rechaza"""
+        path = tmp_path / 'corrupto.bin'
+        path.write_bytes(b'x' * 64)
+        with pytest.raises(ValueError):
+            CommonPasswordFilter(str(path))
+
+
+@pytest.fixture
+def filter_cache():
+    """Vaciar el filtro en caché antes y después del test, cerrando su mmap"""
+    common_passwords.close_common_password_filter()
+    yield
+    common_passwords.close_common_password_filter()
+
+
+@pytest.mark.usefixtures('filter_cache')
+class TestCommonPasswordCheck:
+    """Tests para la verificación usada en el registro"""
+
+    def test_is_common_password(self, filter_path, monkeypatch):
+        """Test: Se rechazan contraseñas comunes y se aceptan las demás"""
+        monkeypatch.setattr(common_passwords, 'COMMON_PASSWORDS_PATH', filter_path)
+
+        assert common_passwords.is_common_password('qwerty') is True
+        assert common_passwords.is_common_password('Tr3s-Tigres-Tristes') is False
+
+    def test_missing_file_is_graceful(self, tmp_path, monkeypatch):
+        """Test: Sin archivo no se rechaza ninguna contraseña"""
+        monkeypatch.setattr(common_passwords, 'COMMON_PASSWORDS_PATH',
+                            str(tmp_path / 'no-existe.bin'))
+
+        assert common_passwords.is_common_password('123456') is False
@@ -0,0 +1,175 @@
+"""
+Tests para los comandos de mantenimiento de la base de datos
+"""
+import pytest
+import sqlite3
+import threading
+from contextlib import contextmanager
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from database_maintenance import (
+    backup_database, check_integrity, checkpoint_wal, incremental_vacuum, optimize_database,
+)
+
+
+def create_users_database(path, journal_mode):
+    """Crear una base con usuarios de prueba en el modo de journal indicado"""
+    conn = sqlite3.connect(path)
+    conn.execute(f'PRAGMA journal_mode = {journal_mode}')
+    conn.execute('''
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO users (username, email, password) VALUES (?, ?, ?)',
+        ((f'Usuario {i}', f'usuario{i}@test.com', 'x' * 100) for i in range(2000))
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Base de datos en modo WAL con usuarios de prueba"""
+    return create_users_database(str(tmp_path / 'database.db'), 'WAL')
+
+
+@pytest.fixture
+def rollback_db_path(tmp_path):
+    """Base de datos en modo rollback journal, como la crea database_setup.py"""
+    return create_users_database(str(tmp_path / 'database.db'), 'DELETE')
+
+
+@contextmanager
+def concurrent_writer(path):
+    """Escritor que inserta usuarios continuamente mientras dura el bloque"""
+    errors = []
+    stop = threading.Event()
+
+    def writer():
+        conn = sqlite3.connect(path, timeout=5)
+        i = 0
+        while not stop.is_set():
+            try:
+                conn.execute('INSERT INTO users (username, email, password) VALUES (?, ?, ?)',
+                             ('Nuevo', f'nuevo{i}@test.com', 'x'))
+                conn.commit()
+            except sqlite3.Error as e:
+                errors.append(e)
+            i += 1
+        conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        yield errors
+    finally:
+        stop.set()
+        thread.join()
+
+
+class TestBackup:
+    """Tests para el respaldo en caliente"""
+
+    def test_backup_copies_all_rows(self, db_path, tmp_path):
+        """Test: El respaldo contiene todos los usuarios"""
+        destino = str(tmp_path / 'respaldo.db')
+        report = backup_database(db_path, destino, pages=8, pause=0)
+
+        assert report['pasos'] > 1
+        conn = sqlite3.connect(destino)
+        assert conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 2000
+        conn.close()
+        assert not os.path.exists(destino + '.tmp')
+
+    def test_backup_with_concurrent_writer(self, db_path, tmp_path):
+        """Test: En modo WAL un escritor concurrente no falla durante el respaldo"""
+        destino = str(tmp_path / 'respaldo.db')
+        with concurrent_writer(db_path) as errors:
+            report = backup_database(db_path, destino, pages=4, pause=0.001)
+
+        assert errors == []
+        assert report['pasos'] > 1
+        assert check_integrity(destino)['ok']
+
+    def test_backup_requires_wal(self, rollback_db_path, tmp_path):
+        """Test: En modo rollback journal el respaldo se rechaza sin dejar archivos"""
+        destino = str(tmp_path / 'respaldo.db')
+        with pytest.raises(RuntimeError, match='WAL'):
+            backup_database(rollback_db_path, destino)
+
+        assert not os.path.exists(destino)
+        assert not os.path.exists(destino + '.tmp')
+
+    def test_backup_deadline_aborts(self, db_path, tmp_path):
+        """Test: Superar el límite de tiempo aborta sin dejar archivos"""
+        destino = str(tmp_path / 'respaldo.db')
+        with pytest.raises(RuntimeError):
+            backup_database(db_path, destino, pages=1, pause=0, deadline=0)
+
+        assert not os.path.exists(destino)
+        assert not os.path.exists(destino + '.tmp')
+
+    def test_backup_missing_database(self, tmp_path):
+        """Test: Error claro si la base no existe"""
+        with pytest.raises(FileNotFoundError):
+            backup_database(str(tmp_path / 'no-existe.db'), str(tmp_path / 'respaldo.db'))
+
+
+class TestMaintenanceCommands:
+    """Tests para checkpoint, optimización, vacuum e integridad"""
+
+    def test_checkpoint_truncate(self, db_path):
+        """Test: TRUNCATE deja el archivo WAL vacío"""
+        # Conexión abierta para que el WAL no se elimine al cerrar
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE users SET username = 'Editado' WHERE id < 100")
+        conn.commit()
+        assert os.path.getsize(db_path + '-wal') > 0
+
+        report = checkpoint_wal(db_path, 'truncate')
+        assert report['journal_mode'] == 'wal'
+        assert report['bloqueado'] is False
+        assert report['frames_copiados'] == report['frames_wal']
+        assert os.path.getsize(db_path + '-wal') == 0
+        conn.close()
+
+    def test_checkpoint_invalid_mode(self, db_path):
+        """Test: Un modo desconocido se rechaza"""
+        with pytest.raises(ValueError):
+            checkpoint_wal(db_path, 'AGRESIVO')
+
+    @pytest.mark.parametrize('full_analyze', [False, True])
+    def test_optimize(self, db_path, full_analyze):
+        """Test: La optimización genera estadísticas en una base sin analizar"""
+        optimize_database(db_path, full_analyze=full_analyze)
+        conn = sqlite3.connect(db_path)
+        assert conn.execute('SELECT COUNT(*) FROM sqlite_stat1').fetchone()[0] > 0
+        conn.close()
+
+    def test_incremental_vacuum(self, db_path):
+        """Test: Vacuum incremental libera páginas tras borrar usuarios"""
+        with pytest.raises(RuntimeError):
+            incremental_vacuum(db_path)
+
+        incremental_vacuum(db_path, enable=True)
+        conn = sqlite3.connect(db_path)
+        conn.execute('DELETE FROM users WHERE id > 200')
+        conn.commit()
+        conn.close()
+        checkpoint_wal(db_path, 'TRUNCATE')
+
+        report = incremental_vacuum(db_path, pages=10)
+        assert report['paginas_liberadas'] == 10
+
+    def test_integrity_check(self, db_path):
+        """Test: Una base sana pasa ambas verificaciones"""
+        assert check_integrity(db_path)['ok']
+        assert check_integrity(db_path, quick=True)['ok']
@@ -0,0 +1,86 @@
+"""
+Tests para la caché por proceso de archivos mapeados
+"""
+import threading
+import time
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from shared_file_cache import SharedFileCache
+
+
+class FakeMappedFile:
+    """Archivo abierto de prueba que registra si se cerró"""
+
+    opened = []
+
+    def __init__(self, path):
+        if path.endswith('no-existe'):
+            raise FileNotFoundError(path)
+        if path.endswith('lento'):
+            time.sleep(0.05)
+        self.path = path
+        self.closed = False
+        FakeMappedFile.opened.append(self)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def cache():
+    """Caché con la ruta por defecto 'default'"""
+    FakeMappedFile.opened = []
+    file_cache = SharedFileCache(FakeMappedFile, lambda: 'default', 'prueba')
+    yield file_cache
+    file_cache.clear()
+
+
+class TestSharedFileCache:
+    """Tests para apertura, reemplazo y cierre"""
+
+    def test_opens_once(self, cache):
+        """Test: Las llamadas sin ruta reutilizan el objeto abierto"""
+        first = cache.get()
+        assert first.path == 'default'
+        assert cache.get() is first
+        assert len(FakeMappedFile.opened) == 1
+
+    def test_missing_file_cached_as_none(self, cache):
+        """Test: Un archivo ausente se registra una vez y queda en None"""
+        assert cache.get('no-existe') is None
+        assert cache.get() is None
+        assert FakeMappedFile.opened == []
+
+    def test_explicit_path_replaces_without_closing(self, cache):
+        """Test: Otra ruta reemplaza al objeto sin cerrar el que otro hilo puede usar"""
+        old = cache.get()
+        new = cache.get('otro')
+
+        assert cache.get() is new
+        assert not old.closed
+
+    def test_concurrent_loads_open_once(self):
+        """Test: Varios hilos cargando a la vez abren el archivo una sola vez"""
+        FakeMappedFile.opened = []
+        cache = SharedFileCache(FakeMappedFile, lambda: 'lento', 'prueba')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get()))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(FakeMappedFile.opened) == 1
+        assert all(result is FakeMappedFile.opened[0] for result in results)
+
+    def test_clear_closes(self, cache):
+        """Test: clear() cierra el objeto y la siguiente consulta lo reabre"""
+        first = cache.get()
+        cache.clear()
+
+        assert first.closed
+        assert cache.get() is not first